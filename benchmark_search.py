@@ -0,0 +1,106 @@
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from database import get_db, init_db, search_messages, store_messages
+
+# Benchmark configuration
+VOCABULARY_SIZE = 20000
+USERS = [f"user{i}" for i in range(200)]
+INSERT_BATCH_SIZE = 10000
+
+
+def generate_vocabulary(size: int) -> list:
+    """Generate pseudo-words used to build the message bodies"""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(random.choices(letters, k=random.randint(3, 9))) for _ in range(size)]
+
+
+def populate(database_name: str, total: int, vocabulary: list) -> float:
+    """Fill the database with random group and private messages, returning the elapsed time"""
+    # Zipf-like weights, so that a few words are very common and most are rare
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    start = time.perf_counter()
+
+    for offset in range(0, total, INSERT_BATCH_SIZE):
+        batch = []
+        for _ in range(min(INSERT_BATCH_SIZE, total - offset)):
+            sender = random.choice(USERS)
+            is_private = random.random() < 0.3
+            recipient = random.choice(USERS) if is_private else None
+            words = random.choices(vocabulary, cum_weights=cum_weights, k=random.randint(3, 20))
+            batch.append((
+                'private' if is_private else 'group',
+                sender,
+                recipient,
+                ' '.join(words),
+                '2025-01-01 12:00:00'
+            ))
+        store_messages(batch, database_name)
+
+    return time.perf_counter() - start
+
+
+def time_queries(database_name: str, queries: list, pages: int) -> list:
+    """Run every query for the first pages of results and return the latencies in milliseconds"""
+    latencies = []
+    for query in queries:
+        for page in range(pages):
+            username = random.choice(USERS)
+            start = time.perf_counter()
+            search_messages(username, query, 21, page * 20, database_name)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: list) -> None:
+    """Print latency percentiles for a set of queries"""
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<16} p50 {statistics.median(latencies):8.2f} ms   p95 {p95:8.2f} ms   max {latencies[-1]:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full-text search over the chat history")
+    parser.add_argument('--messages', type=int, default=2_000_000, help="number of messages to index")
+    parser.add_argument('--queries', type=int, default=50, help="number of queries per category")
+    parser.add_argument('--pages', type=int, default=3, help="number of result pages fetched per query")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    vocabulary = generate_vocabulary(VOCABULARY_SIZE)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_name = os.path.join(directory, 'benchmark.db')
+        init_db(database_name)
+
+        elapsed = populate(database_name, args.messages, vocabulary)
+        print(f"Indexed {args.messages} messages in {elapsed:.1f} s ({args.messages / elapsed:.0f} messages/s)")
+
+        with get_db(database_name) as conn:
+            conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('optimize')")
+            conn.commit()
+
+        # Common words match a large share of the history, rare words only a few messages
+        common = random.sample(vocabulary[:20], min(args.queries, 20))
+        rare = random.sample(vocabulary[-5000:], args.queries)
+        phrases = [f"{random.choice(vocabulary[:200])} {random.choice(vocabulary[:2000])}" for _ in range(args.queries)]
+        prefixes = [word[:3] for word in random.sample(vocabulary[:2000], args.queries)]
+        short_prefixes = [word[:2] for word in random.sample(vocabulary[:2000], args.queries)]
+        letters = [word[:1] for word in random.sample(vocabulary[:2000], args.queries)]
+
+        report("common word", time_queries(database_name, common, args.pages))
+        report("rare word", time_queries(database_name, rare, args.pages))
+        report("two words", time_queries(database_name, phrases, args.pages))
+        report("prefix", time_queries(database_name, prefixes, args.pages))
+        report("2-char prefix", time_queries(database_name, short_prefixes, args.pages))
+        report("1-char query", time_queries(database_name, letters, args.pages))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,9 @@ import sqlite3
 import bcrypt
 from contextlib import contextmanager
 import logging
-from typing import Optional, Tuple
+from typing import Iterable, List, Optional, Tuple
 import os
+import unicodedata
 from datetime import datetime
 
 # Configure logging
@@ -17,12 +18,21 @@ logger = logging.getLogger(__name__)
 # Database configuration
 DATABASE_NAME = 'chat_users.db'
 
+# Search configuration
+SEARCH_MAX_TERMS = 16
+SEARCH_MAX_QUERY_LENGTH = 256
+SEARCH_MIN_PREFIX_LENGTH = 2  # shorter terms match whole words only, see the prefix index below
+SEARCH_CANDIDATE_LIMIT = 2000  # most recent matches that are ranked, bounds the cost of very common terms
+
+# Row layout accepted by store_messages: (chat_type, sender_username, recipient_username, message, created_at)
+MessageRow = Tuple[str, str, Optional[str], str, str]
+
 @contextmanager
-def get_db():
+def get_db(database_name: Optional[str] = None):
     """Context manager for database connection."""
     conn = None
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
+        conn = sqlite3.connect(database_name or DATABASE_NAME)
         yield conn
     except sqlite3.Error as e:
         logger.error(f"Database error: {e}")
@@ -31,10 +41,10 @@ def get_db():
         if conn:
             conn.close()
 
-def init_db():
-    """Initialize the database by creating the users table if it doesn't exist."""
+def init_db(database_name: Optional[str] = None):
+    """Initialize the database by creating the users, messages and search tables if they don't exist."""
     try:
-        with get_db() as conn:
+        with get_db(database_name) as conn:
             cursor = conn.cursor()
             # Create the users table with uniqueness and not null constraints
             cursor.execute('''
@@ -46,6 +56,37 @@ def init_db():
                     last_login TIMESTAMP
                 )
             ''')
+            # Chat history: recipient_username is NULL for group messages
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_type TEXT NOT NULL CHECK (chat_type IN ('group', 'private')),
+                    sender_username TEXT NOT NULL,
+                    recipient_username TEXT,
+                    message TEXT NOT NULL,
+                    created_at TIMESTAMP NOT NULL
+                )
+            ''')
+            # Full-text index over the message bodies, kept in sync by the trigger below
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    message,
+                    content='messages',
+                    content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                )
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                    INSERT INTO messages_fts(rowid, message) VALUES (new.id, new.message);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+                    INSERT INTO messages_fts(messages_fts, rowid, message) VALUES ('delete', old.id, old.message);
+                END
+            ''')
             conn.commit()
             logger.info("Database initialized successfully")
     except sqlite3.Error as e:
@@ -195,7 +236,9 @@ def get_user_info(username: str) -> Optional[Tuple[int, str, str, str]]:
 
 def delete_user(username: str, password: str) -> bool:
     """
-    Delete a user from the database if the credentials are correct.
+    Delete a user and their chat history from the database if the credentials are correct.
+    Messages are removed too, since a new user registering the same username would otherwise
+    be able to search the deleted user's private conversations.
 
     Args:
         username: The username to delete
@@ -209,6 +252,10 @@ def delete_user(username: str, password: str) -> bool:
             with get_db() as conn:
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM users WHERE username = ?', (username,))
+                cursor.execute(
+                    'DELETE FROM messages WHERE sender_username = ? OR recipient_username = ?',
+                    (username, username)
+                )
                 conn.commit()
                 logger.info(f"User {username} deleted successfully")
                 return True
@@ -217,6 +264,133 @@ def delete_user(username: str, password: str) -> bool:
         logger.error(f"Error deleting user: {e}")
         return False
 
+def store_messages(rows: Iterable[MessageRow], database_name: Optional[str] = None) -> bool:
+    """
+    Store a batch of chat messages and index them for full-text search in a single transaction.
+
+    Args:
+        rows: Tuples of (chat_type, sender_username, recipient_username, message, created_at)
+        database_name: Optional database file, defaults to DATABASE_NAME
+
+    Returns:
+        bool: True if the batch was stored, False otherwise
+    """
+    try:
+        with get_db(database_name) as conn:
+            conn.executemany(
+                'INSERT INTO messages (chat_type, sender_username, recipient_username, message, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.commit()
+            return True
+    except Exception as e:
+        logger.error(f"Error storing messages: {e}")
+        return False
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turn free user input into a safe FTS5 MATCH expression.
+
+    Every term is quoted so that FTS5 operators typed by the user are matched literally,
+    and the last term is matched as a prefix to support search-as-you-type. Prefixes shorter
+    than SEARCH_MIN_PREFIX_LENGTH would merge the doclists of a large part of the vocabulary,
+    so such terms are matched as whole words instead. Control characters are removed and
+    terms without letters or digits are dropped, since FTS5 cannot match them anyway.
+
+    Args:
+        query: The raw search text
+
+    Returns:
+        Optional[str]: The MATCH expression, or None if the query has no searchable terms
+    """
+    # Control characters separate terms, like whitespace
+    text = ''.join(
+        ' ' if unicodedata.category(char).startswith('C') else char
+        for char in query[:SEARCH_MAX_QUERY_LENGTH]
+    )
+    terms = [term for term in text.split() if any(char.isalnum() for char in term)][:SEARCH_MAX_TERMS]
+    if not terms:
+        return None
+
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    if len(terms[-1]) >= SEARCH_MIN_PREFIX_LENGTH:
+        quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def search_messages(username: str, query: str, limit: int, offset: int = 0,
+                    database_name: Optional[str] = None
+                    ) -> Tuple[List[Tuple[int, str, str, Optional[str], str, str]], bool]:
+    """
+    Search the chat history visible to a user, best matches first.
+
+    A user can see every group message and the private messages they sent or received.
+    Only the SEARCH_CANDIDATE_LIMIT most recent visible matches are ranked, so that terms
+    matching a large share of the history don't have to be scored in full. Older matches
+    cannot be reached then, which is reported so that the user can narrow the query.
+
+    Args:
+        username: The user performing the search
+        query: The raw search text
+        limit: Maximum number of results to return
+        offset: Number of results to skip, for pagination
+        database_name: Optional database file, defaults to DATABASE_NAME
+
+    Returns:
+        Tuple[List[Tuple], bool]: Tuples with (id, chat_type, sender_username, recipient_username, message,
+        created_at), and whether the matches were truncated to the SEARCH_CANDIDATE_LIMIT most recent ones
+    """
+    match_query = build_match_query(query)
+    if match_query is None:
+        return [], False
+
+    # One match more than the limit is fetched, only to tell whether the candidates were truncated
+    candidates = '''
+        WITH matches AS (
+            SELECT m.*, messages_fts.rank AS rank
+            FROM messages_fts
+            JOIN messages AS m ON m.id = messages_fts.rowid
+            WHERE messages_fts MATCH ?
+              AND (m.chat_type = 'group' OR m.sender_username = ? OR m.recipient_username = ?)
+            ORDER BY messages_fts.rowid DESC
+            LIMIT ?
+        ),
+        candidates AS (
+            SELECT *, COUNT(*) OVER () AS match_count
+            FROM matches
+            ORDER BY id DESC
+            LIMIT ?
+        )
+    '''
+    candidate_args = (match_query, username, username, SEARCH_CANDIDATE_LIMIT + 1, SEARCH_CANDIDATE_LIMIT)
+
+    try:
+        with get_db(database_name) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                candidates + '''
+                SELECT id, chat_type, sender_username, recipient_username, message, created_at,
+                       match_count
+                FROM candidates
+                ORDER BY rank, id DESC
+                LIMIT ? OFFSET ?
+                ''',
+                candidate_args + (limit, offset)
+            )
+            rows = cursor.fetchall()
+
+            if rows:
+                match_count = rows[0][-1]
+            else:
+                # The page is past the last match, count the matches on their own
+                cursor.execute(candidates + 'SELECT COUNT(*) FROM matches', candidate_args)
+                match_count = cursor.fetchone()[0]
+
+            return [row[:-1] for row in rows], match_count > SEARCH_CANDIDATE_LIMIT
+    except Exception as e:
+        logger.error(f"Error searching messages: {e}")
+        return [], False
+
 # Initialize the database if it doesn't exist
 if __name__ == '__main__':
     if not os.path.exists(DATABASE_NAME):
@@ -1,6 +1,8 @@
+import asyncio
 import hashlib
 import json
 import secrets
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import Dict, Set
 
@@ -10,7 +12,8 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
 import uvicorn
-from database import create_user, verify_user
+from database import create_user, init_db, verify_user
+from search import DEFAULT_PAGE_SIZE, MessageIndexer
 
 
 def generate_secret_key(timestamp: str, app_id: str = "chat_app_v1") -> str:
@@ -29,8 +32,26 @@ TEMPLATES_DIR = "templates"
 STATIC_DIR = "static"
 UTC_OFFSET = 1  # hours
 
+# Search index initialization
+indexer = MessageIndexer()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the database and keep the search index flushed while the app is running"""
+    init_db()
+    flush_task = asyncio.create_task(indexer.run())
+    yield
+    flush_task.cancel()
+    try:
+        await flush_task
+    except asyncio.CancelledError:
+        pass
+    await indexer.flush()
+
+
 # App initialization
-app = FastAPI(title="Chat Application")
+app = FastAPI(title="Chat Application", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
@@ -147,8 +168,10 @@ class ConnectionManager:
         receiver = self.state.active_connections[receiver_id]
 
         # Create message data
+        timestamp = self.get_timestamp()
         message_data = self.create_message(
             'private_message',
+            timestamp=timestamp,
             chat_id=chat_id,
             sender_username=sender['username'],
             message=message
@@ -162,6 +185,8 @@ class ConnectionManager:
         sender_message['is_self'] = True
         await sender['ws'].send_text(json.dumps(sender_message))
 
+        await indexer.add_message('private', sender['username'], receiver['username'], message, timestamp)
+
     async def broadcast_group_message(self, sender_id: ClientId, message: str) -> None:
         """Broadcast a group message from one client to all other clients"""
         if sender_id not in self.state.active_connections:
@@ -170,8 +195,10 @@ class ConnectionManager:
         sender = self.state.active_connections[sender_id]
 
         # Create message data
+        timestamp = self.get_timestamp()
         group_message = self.create_message(
             'group_message',
+            timestamp=timestamp,
             chat_id='group',
             sender_username=sender['username'],
             message=message
@@ -182,6 +209,20 @@ class ConnectionManager:
             if client_id != sender_id:
                 await connection['ws'].send_text(group_message)
 
+        await indexer.add_message('group', sender['username'], None, message, timestamp)
+
+    async def send_search_results(self, client_id: ClientId, query: object, page: object, page_size: object) -> None:
+        """
+        Search the chat history visible to a client and send back one page of ranked results.
+        The values are passed on as sent by the client and validated by the indexer.
+        """
+        if client_id not in self.state.active_connections:
+            return
+
+        connection = self.state.active_connections[client_id]
+        results = await indexer.search(connection['username'], query, page, page_size)
+        await connection['ws'].send_text(self.create_message('search_results', **results))
+
 
 manager = ConnectionManager()
 
@@ -289,6 +330,7 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
     - Disconnect: Remove user from active users and broadcast system message
     - Private message: Send a private message to another user
     - Group message: Broadcast a message to all connected users
+    - Search: Return ranked, paginated matches from the chat history visible to the user
     """
     try:
         # Check if the user is authenticated
@@ -312,6 +354,13 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                     await manager.send_private_message(client_id, data['receiver_id'], data['message'])
                 elif data['type'] == 'group_message':
                     await manager.broadcast_group_message(client_id, data['message'])
+                elif data['type'] == 'search':
+                    await manager.send_search_results(
+                        client_id,
+                        data.get('query', ''),
+                        data.get('page', 0),
+                        data.get('page_size', DEFAULT_PAGE_SIZE)
+                    )
         except WebSocketDisconnect:
             # Handle disconnection
             username = manager.disconnect(client_id)
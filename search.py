@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from database import SEARCH_CANDIDATE_LIMIT, MessageRow, search_messages, store_messages
+
+logger = logging.getLogger(__name__)
+
+# Indexing configuration
+INDEX_BATCH_SIZE = 100
+INDEX_FLUSH_INTERVAL = 2.0  # seconds
+INDEX_MAX_RETRIES = 5  # consecutive failed flushes before the queued messages are dropped
+INDEX_MAX_PENDING = 10000  # messages kept for retry while the database is unavailable
+
+# Pagination configuration
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+
+def store_each(rows: List[MessageRow]) -> List[MessageRow]:
+    """Store messages one by one, returning the ones that could not be stored"""
+    return [row for row in rows if not store_messages([row])]
+
+
+def parse_int(value: object, default: int) -> int:
+    """Parse an integer sent by a client, falling back to the default on invalid input"""
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        return default
+
+
+class MessageIndexer:
+    """Buffer chat messages and write them to the search index in batches"""
+
+    def __init__(self, batch_size: int = INDEX_BATCH_SIZE, flush_interval: float = INDEX_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending: List[MessageRow] = []
+        self.failed_flushes = 0
+        self.lock = asyncio.Lock()
+
+    async def add_message(self, chat_type: str, sender_username: str, recipient_username: Optional[str],
+                          message: str, timestamp: str) -> None:
+        """Queue a message for indexing, flushing as soon as a full batch is available"""
+        if not isinstance(message, str):
+            logger.warning(f"Message from {sender_username} not indexed: message is not text")
+            return
+
+        self.pending.append((chat_type, sender_username, recipient_username, message, timestamp))
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write all queued messages to the database, falling back to one message at a time on failure"""
+        async with self.lock:
+            if not self.pending:
+                return
+
+            batch, self.pending = self.pending, []
+            if await asyncio.to_thread(store_messages, batch):
+                self.failed_flushes = 0
+                return
+
+            # Store the messages one by one, so that a single bad message cannot block the others
+            failed = await asyncio.to_thread(store_each, batch)
+            if len(failed) < len(batch):
+                self.failed_flushes = 0
+                if failed:
+                    logger.error(f"Dropped {len(failed)} messages that could not be indexed")
+                return
+
+            # Nothing could be stored: keep the messages for the next flush, within limits
+            self.failed_flushes += 1
+            if self.failed_flushes >= INDEX_MAX_RETRIES:
+                logger.error(f"Dropped {len(failed)} messages after {self.failed_flushes} failed flushes")
+                self.failed_flushes = 0
+                return
+
+            self.pending = failed + self.pending
+            if len(self.pending) > INDEX_MAX_PENDING:
+                logger.error(f"Dropped {len(self.pending) - INDEX_MAX_PENDING} messages: index queue is full")
+                self.pending = self.pending[-INDEX_MAX_PENDING:]
+
+    def has_pending_for(self, username: str) -> bool:
+        """Check if any queued message would be visible to a user in search results"""
+        return any(
+            chat_type == 'group' or username in (sender_username, recipient_username)
+            for chat_type, sender_username, recipient_username, _, _ in self.pending
+        )
+
+    async def run(self) -> None:
+        """Periodically flush queued messages so that quiet chats still become searchable"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # Shielded so that cancelling the loop never interrupts a batch being written,
+            # the lock stays held until the write is done
+            await asyncio.shield(self.flush())
+
+    async def search(self, username: str, query: object, page: object = 0,
+                     page_size: object = DEFAULT_PAGE_SIZE) -> Dict:
+        """
+        Search the chat history visible to a user and return one page of ranked results.
+        Queued messages are flushed first only if the user could see one of them, so that
+        searches don't turn every batch into a write of its own. Messages the user cannot see
+        are left to the periodic flush and are indexed within INDEX_FLUSH_INTERVAL seconds.
+        Only the candidate_limit most recent matches are ranked; truncated is set when there
+        were more, in which case older matches can only be found with a narrower query.
+        The query and pagination values come from the client and are validated here.
+        """
+        query = query if isinstance(query, str) else ''
+        page = max(parse_int(page, 0), 0)
+        page_size = min(max(parse_int(page_size, DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+
+        if self.has_pending_for(username):
+            await self.flush()
+        # Fetch one extra row to know whether another page exists
+        rows, truncated = await asyncio.to_thread(search_messages, username, query, page_size + 1, page * page_size)
+
+        results = [
+            {
+                'id': message_id,
+                'chat_type': chat_type,
+                'sender_username': sender_username,
+                'recipient_username': recipient_username,
+                'message': message,
+                'timestamp': created_at
+            }
+            for message_id, chat_type, sender_username, recipient_username, message, created_at in rows[:page_size]
+        ]
+        return {'query': query, 'page': page, 'page_size': page_size, 'has_more': len(rows) > page_size,
+                'truncated': truncated, 'candidate_limit': SEARCH_CANDIDATE_LIMIT, 'results': results}
@@ -5,9 +5,13 @@ if (performance.navigation.type === 1) {
 
 // Initialize client ID using the current timestamp
 const client_id = Date.now().toString();
+const username = document.querySelector('.user-name').textContent.trim(); // Username of the logged in user
 let currentChatId = 'group'; // Default chat ID is 'group'
 const chats = new Map(); // Map to store chat messages
 const unreadMessages = new Map(); // Map to store unread messages count
+let searchQuery = ''; // Query of the search results currently shown
+let searchPage = 0; // Page of the search results currently shown
+let searchTimeout = null; // Debounce timer for the search input
 
 /**
  * Get the current timestamp in UTC+1 (Europe/Rome) timezone.
@@ -207,6 +211,8 @@ ws.onmessage = function(event) {
 
     if (data.type === 'online_users') {
         updateOnlineUsers(data.users);
+    } else if (data.type === 'search_results') {
+        displaySearchResults(data);
     } else {
         const chatId = data.type === 'private_message' ? data.chat_id : 'group';
         initChat(chatId);
@@ -329,6 +335,88 @@ function sendMessage() {
     }
 }
 
+/**
+ * Requests a page of search results for the given query.
+ * @param {string} query - The text to search for.
+ * @param {number} page - The page of results to request.
+ */
+function searchMessages(query, page) {
+    searchQuery = query;
+    searchPage = page;
+    ws.send(JSON.stringify({
+        type: 'search',
+        query: query,
+        page: page
+    }));
+}
+
+/**
+ * Requests the next page of results for the current search.
+ */
+function loadMoreSearchResults() {
+    searchMessages(searchQuery, searchPage + 1);
+}
+
+/**
+ * Displays the search results received from the server.
+ * @param {Object} data - The search results message.
+ */
+function displaySearchResults(data) {
+    // Ignore results for a query that has since been changed
+    if (data.query !== searchQuery) {
+        return;
+    }
+
+    const resultsDiv = document.getElementById('search-results');
+    if (data.page === 0) {
+        resultsDiv.innerHTML = ''; // Clear the previous results
+    }
+
+    data.results.forEach(result => {
+        const chatName = result.chat_type === 'group'
+            ? 'Group Chat'
+            : `Chat with ${result.sender_username === username ? result.recipient_username : result.sender_username}`;
+
+        // Use textContent so that message text is never interpreted as HTML
+        const resultElement = document.createElement('div');
+        resultElement.className = 'search-result';
+        const sender = document.createElement('span');
+        sender.className = 'sender';
+        sender.textContent = `${result.sender_username === username ? 'You' : result.sender_username} · ${chatName}`;
+        const message = document.createElement('p');
+        message.textContent = result.message;
+        const timestamp = document.createElement('span');
+        timestamp.className = 'timestamp';
+        timestamp.textContent = result.timestamp;
+        resultElement.append(sender, message, timestamp);
+        resultsDiv.appendChild(resultElement);
+    });
+
+    if (data.page === 0 && data.results.length === 0) {
+        resultsDiv.textContent = 'No messages found';
+    }
+
+    // Only the most recent matches are ranked, so older ones need a more specific query
+    const notice = document.getElementById('search-notice');
+    notice.textContent = `Showing the best of the ${data.candidate_limit} most recent matches, refine your search to find older messages`;
+    notice.style.display = data.truncated ? 'block' : 'none';
+    document.getElementById('search-more').style.display = data.has_more ? 'block' : 'none';
+}
+
+// Search the chat history while typing, waiting for a short pause
+document.getElementById('searchText').addEventListener('input', function(e) {
+    clearTimeout(searchTimeout);
+    const query = e.target.value.trim();
+    if (!query) {
+        searchQuery = '';
+        document.getElementById('search-results').innerHTML = '';
+        document.getElementById('search-notice').style.display = 'none';
+        document.getElementById('search-more').style.display = 'none';
+        return;
+    }
+    searchTimeout = setTimeout(() => searchMessages(query, 0), 300);
+});
+
 // Add an event listener for the Enter key to send a message
 document.getElementById('messageText').addEventListener('keypress', function(e) {
     if (e.key === 'Enter' && !e.shiftKey) {